@@ -0,0 +1,353 @@
+"""Shared, version-keyed loaders for the cleaned data files.
+
+Every table is read from ``data/cleaned`` when the cleaner has produced it and
+from the raw CSV otherwise. Parsed frames are kept in memory and keyed by the
+size and mtime of the files they came from, so a request only pays for a
+parse after the underlying data has changed. Callers must treat the returned
+frames as read-only.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock, RLock
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+CLEANED_DIR = DATA_DIR / "cleaned"
+
+SIGNAL_COLUMNS = ["date", "sku", "source", "hashtag", "mentions"]
+# region,sku,on_hand per row; see load_inventory for how regions are summed
+INVENTORY_FILE = DATA_DIR / "inventory.csv"
+HISTORIC_PARTITIONS = CLEANED_DIR / "historic_regions"
+
+# Rows without a region are kept under DEFAULT_REGION; GLOBAL_REGION is the
+# cross-region total and is never stored.
+GLOBAL_REGION = "global"
+DEFAULT_REGION = "unassigned"
+
+SKU_TITLES = {
+    "GS-019": "Electric Kettle",
+    "BL-101": "High-speed Blender",
+    "GS-045": "Premium Mug",
+    "VDJ-045": "Vintage Denim Jacket",
+    "PDE-112": "Freshwater Pearl Earrings",
+    "LCB-089": "Leather Crossbody",
+    "CBS-067": "Cashmere Sweater",
+}
+SKU_PRICE = {
+    "GS-019": 280.0,
+    "BL-101": 190.0,
+    "GS-045": 140.0,
+}
+
+# Each signal feed is normalized into SIGNAL_COLUMNS by scripts/clean_data.py
+# and tagged with its feed name in the unified table. Adding a feed is one
+# entry here plus one call in the cleaner.
+SIGNAL_FEEDS: Dict[str, Dict[str, str]] = {
+    "social": {"cleaned": "social.parquet", "raw": "social.csv", "default_source": "social"},
+    "google": {"cleaned": "google_signals.parquet", "raw": "google_signals.csv", "default_source": "Google"},
+}
+
+# Tables keyed by request parameters (horizon, paths, ...) go in a bounded LRU
+# so query strings cannot grow the cache without limit.
+MAX_CACHED_VARIANTS = 64
+
+LOGGER = logging.getLogger("data")
+
+_CACHE: Dict[str, Tuple[str, Any]] = {}
+_VARIANTS: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+_VARIANT_LOCKS: Dict[str, Lock] = {}
+_LOCK = RLock()
+
+
+def _file_stamp(path: Path) -> str:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return f"{path.name}:missing"
+    return f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def files_version(paths: Iterable[Path]) -> str:
+    """Return a short digest that changes whenever any of ``paths`` changes."""
+    stamps = "|".join(_file_stamp(path) for path in paths)
+    return hashlib.sha1(stamps.encode("utf-8")).hexdigest()[:12]
+
+
+def cached_table(name: str, version: str, build: Callable[[], Any]) -> Any:
+    """Return the value cached under ``name`` for ``version``, building it on a miss."""
+    entry = _CACHE.get(name)
+    if entry and entry[0] == version:
+        return entry[1]
+    with _LOCK:
+        entry = _CACHE.get(name)
+        if entry and entry[0] == version:
+            return entry[1]
+        value = build()
+        _CACHE[name] = (version, value)
+        return value
+
+
+def cached_variant(name: str, version: str, build: Callable[[], Any]) -> Any:
+    """Like ``cached_table`` for per-parameter tables, keeping the ``MAX_CACHED_VARIANTS`` most recent.
+
+    Builds run under a lock for ``name`` only, so a slow variant does not block
+    lookups or builds of other tables.
+    """
+    entry = _VARIANTS.get(name)
+    if entry and entry[0] == version:
+        with _LOCK:
+            if name in _VARIANTS:
+                _VARIANTS.move_to_end(name)
+        return entry[1]
+    with _LOCK:
+        key_lock = _VARIANT_LOCKS.setdefault(name, Lock())
+    with key_lock:
+        entry = _VARIANTS.get(name)
+        if entry and entry[0] == version:
+            return entry[1]
+        value = build()
+    with _LOCK:
+        _VARIANTS[name] = (version, value)
+        _VARIANTS.move_to_end(name)
+        while len(_VARIANTS) > MAX_CACHED_VARIANTS:
+            evicted, _ = _VARIANTS.popitem(last=False)
+            _VARIANT_LOCKS.pop(evicted, None)
+    return value
+
+
+def signal_paths() -> list[Path]:
+    paths = []
+    for feed in SIGNAL_FEEDS.values():
+        paths.append(CLEANED_DIR / feed["cleaned"])
+        paths.append(DATA_DIR / feed["raw"])
+    return paths
+
+
+def signals_version() -> str:
+    return files_version(signal_paths())
+
+
+# Header aliases accepted in raw signal CSVs, matched case-insensitively.
+SIGNAL_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "date": ("date", "ts", "timestamp"),
+    "hashtag": ("hashtag", "tag", "topic", "keyword", "query"),
+    "mentions": ("mentions", "count", "mentions_count", "volume"),
+    "source": ("source", "platform"),
+    "sku": ("sku", "product"),
+}
+
+
+def _normalize_hashtag(tag: Any) -> str:
+    if not isinstance(tag, str):
+        return ""
+    tag = tag.strip()
+    if tag == "":
+        return ""
+    if not tag.startswith("#"):
+        tag = "#" + tag
+    return tag.lower()
+
+
+def normalize_signal_feed(df: pd.DataFrame, default_source: str) -> pd.DataFrame:
+    """Map a raw signal feed onto SIGNAL_COLUMNS.
+
+    Shared by ``scripts/clean_data.py`` and the raw-CSV fallback below so both
+    paths produce the same table. Raises ``ValueError`` without a date column.
+    """
+    # One source column per target: the earliest alias wins, so a feed with
+    # both "hashtag" and "keyword" keeps "hashtag" and ignores the other.
+    col_map = {}
+    for target, aliases in SIGNAL_ALIASES.items():
+        matches = [column for column in df.columns if str(column).lower() in aliases]
+        if matches:
+            best = min(matches, key=lambda column: aliases.index(str(column).lower()))
+            col_map[best] = target
+    df = df[list(col_map)].rename(columns=col_map)
+    if "date" not in df.columns:
+        raise ValueError("signal feed must have a date/timestamp column")
+
+    out = pd.DataFrame(index=df.index)
+    out["date"] = pd.to_datetime(df["date"], errors="coerce")
+    out["sku"] = df.get("sku", pd.Series("", index=df.index)).fillna("").astype(str)
+    out["source"] = (
+        df.get("source", pd.Series("", index=df.index)).fillna("").astype(str).replace({"": default_source})
+    )
+    out["hashtag"] = df.get("hashtag", pd.Series("", index=df.index)).apply(_normalize_hashtag)
+    out["mentions"] = pd.to_numeric(df.get("mentions", 0), errors="coerce").fillna(0).astype(int)
+    return out[SIGNAL_COLUMNS]
+
+
+def _read_signal_feed(feed: Dict[str, str], cleaned_dir: Path, data_dir: Path) -> pd.DataFrame:
+    parquet_path = cleaned_dir / feed["cleaned"]
+    raw_path = data_dir / feed["raw"]
+    if parquet_path.exists():
+        df = pd.read_parquet(parquet_path)
+    elif raw_path.exists():
+        try:
+            df = normalize_signal_feed(pd.read_csv(raw_path), feed["default_source"])
+        except ValueError as exc:
+            LOGGER.warning("data: skipping %s: %s", raw_path.name, exc)
+            return pd.DataFrame(columns=SIGNAL_COLUMNS)
+    else:
+        return pd.DataFrame(columns=SIGNAL_COLUMNS)
+
+    for column in SIGNAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = ""
+    df = df[SIGNAL_COLUMNS].copy()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df["sku"] = df["sku"].fillna("").astype(str).replace({"": "UNKNOWN"})
+    df["source"] = df["source"].fillna("").astype(str).replace({"": feed["default_source"]})
+    df["hashtag"] = df["hashtag"].fillna("").astype(str)
+    df["mentions"] = pd.to_numeric(df["mentions"], errors="coerce").fillna(0).astype(int)
+    return df
+
+
+def read_signals(cleaned_dir: Optional[Path] = None, data_dir: Optional[Path] = None) -> pd.DataFrame:
+    """Build the unified signals table from ``cleaned_dir``, falling back to raw CSVs in ``data_dir``.
+
+    Uncached; the API goes through ``load_signals`` and the cleaner calls this
+    with its own output directory.
+    """
+    cleaned_dir = CLEANED_DIR if cleaned_dir is None else cleaned_dir
+    data_dir = DATA_DIR if data_dir is None else data_dir
+    frames = []
+    for name, feed in SIGNAL_FEEDS.items():
+        df = _read_signal_feed(feed, cleaned_dir, data_dir)
+        if df.empty:
+            continue
+        frames.append(df.assign(feed=name))
+    if not frames:
+        return pd.DataFrame(columns=SIGNAL_COLUMNS + ["feed", "title_hashtag"])
+    df = pd.concat(frames, ignore_index=True)
+    # The same post can be scraped into more than one raw feed; keep it once.
+    df = df.drop_duplicates(subset=SIGNAL_COLUMNS, keep="first")
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    df["title_hashtag"] = df["hashtag"].str.strip()
+    return df
+
+
+def load_signals() -> pd.DataFrame:
+    """Unified, feed-tagged signals table shared by all trend computations."""
+    return cached_table("signals", signals_version(), read_signals)
+
+
+def _historic_paths() -> list[Path]:
+    partitions = sorted(HISTORIC_PARTITIONS.glob("region=*/*.parquet"))
+    return partitions + [CLEANED_DIR / "historic.parquet", DATA_DIR / "historic.csv"]
+
+
+def historic_version() -> str:
+    return files_version(_historic_paths())
+
+
+def _build_historic_all() -> pd.DataFrame:
+    parquet_path = CLEANED_DIR / "historic.parquet"
+    if any(HISTORIC_PARTITIONS.glob("region=*/*.parquet")):
+        df = pd.read_parquet(HISTORIC_PARTITIONS)
+    elif parquet_path.exists():
+        df = pd.read_parquet(parquet_path)
+    else:
+        df = pd.read_csv(DATA_DIR / "historic.csv", parse_dates=["date"])
+    df = df.dropna(subset=["date", "sku"])
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df = df[df["date"].notna()]
+    df["sku"] = df["sku"].astype(str)
+    if "region" not in df.columns:
+        df["region"] = DEFAULT_REGION
+    df["region"] = df["region"].astype(str).replace({"": DEFAULT_REGION, "nan": DEFAULT_REGION})
+    df["units"] = pd.to_numeric(df["units"], errors="coerce").fillna(0)
+    df = df[["date", "sku", "region", "units"]]
+    return df.sort_values(["region", "sku", "date"], kind="stable").reset_index(drop=True)
+
+
+def _build_historic_regions() -> Dict[str, pd.DataFrame]:
+    df = _build_historic_all()
+    regions = {
+        str(region): group.reset_index(drop=True)
+        for region, group in df.groupby("region", sort=True)
+        if region != GLOBAL_REGION
+    }
+    # Cross-region totals are computed once per data version and reused by
+    # every "global" request instead of being re-aggregated per call.
+    totals = df.groupby(["sku", "date"], as_index=False, sort=True)["units"].sum()
+    regions[GLOBAL_REGION] = totals.assign(region=GLOBAL_REGION)[["date", "sku", "region", "units"]]
+    return regions
+
+
+def historic_regions() -> Dict[str, pd.DataFrame]:
+    """Historic units per region, sorted by sku then date, plus the ``global`` totals."""
+    return cached_table("historic_regions", historic_version(), _build_historic_regions)
+
+
+def load_historic(region: str = GLOBAL_REGION) -> pd.DataFrame:
+    """Historic units for ``region`` sorted by sku then date; empty for unknown regions."""
+    frame = historic_regions().get(region)
+    if frame is None:
+        return pd.DataFrame(columns=["date", "sku", "region", "units"])
+    return frame
+
+
+def _build_historic_series() -> Dict[Tuple[str, str], Tuple[Any, Any]]:
+    series = {}
+    for region, df in historic_regions().items():
+        for sku, group in df.groupby("sku", sort=False):
+            dates = group["date"].to_numpy(dtype="datetime64[D]")
+            units = group["units"].to_numpy(dtype="float64")
+            series[(region, sku)] = (dates, units)
+    return series
+
+
+def historic_series() -> Dict[Tuple[str, str], Tuple[Any, Any]]:
+    """``(region, sku) -> (dates, units)`` numpy arrays, dates ascending, for range slicing."""
+    return cached_table("historic_series", historic_version(), _build_historic_series)
+
+
+def inventory_version() -> str:
+    return files_version([INVENTORY_FILE])
+
+
+def _build_inventory() -> Dict[Tuple[str, str], float]:
+    if not INVENTORY_FILE.exists():
+        return {}
+    df = pd.read_csv(INVENTORY_FILE)
+    if "sku" not in df.columns or "on_hand" not in df.columns:
+        return {}
+    if "region" not in df.columns:
+        df["region"] = DEFAULT_REGION
+    df["region"] = df["region"].fillna("").astype(str).replace({"": DEFAULT_REGION})
+    df["on_hand"] = pd.to_numeric(df["on_hand"], errors="coerce")
+    df = df.dropna(subset=["sku", "on_hand"])
+    df["sku"] = df["sku"].astype(str)
+    regional = df[df["region"] != GLOBAL_REGION].groupby(["region", "sku"], sort=False)["on_hand"].sum()
+    inventory = {(region, sku): float(units) for (region, sku), units in regional.items()}
+    # Global stock matches global demand: the sum over regions, computed once
+    # per file version like the historic totals. Explicit global rows win.
+    totals = regional.groupby(level="sku").sum()
+    inventory.update(((GLOBAL_REGION, sku), float(units)) for sku, units in totals.items())
+    explicit = df[df["region"] == GLOBAL_REGION].groupby("sku")["on_hand"].sum()
+    inventory.update(((GLOBAL_REGION, sku), float(units)) for sku, units in explicit.items())
+    return inventory
+
+
+def load_inventory() -> Dict[Tuple[str, str], float]:
+    """Units on hand per ``(region, sku)`` from the optional ``inventory.csv``.
+
+    The file needs ``sku`` and ``on_hand`` columns and may have a ``region``
+    column, e.g.::
+
+        region,sku,on_hand
+        eu,GS-019,420
+        us,GS-019,380
+
+    Rows without a region belong to ``DEFAULT_REGION``, as in the historic
+    data. ``global`` stock is the sum over regions unless the file has rows
+    tagged ``global``.
+    """
+    return cached_table("inventory", inventory_version(), _build_inventory)
@@ -0,0 +1,218 @@
+"""Negotiated response compression and a cache of pre-encoded payloads.
+
+``CompressionMiddleware`` compresses JSON/text responses of at least
+``MIN_SIZE`` bytes with the best encoding the client accepts: zstd and
+brotli when their optional packages (``zstandard``, ``brotli``) are
+installed, and gzip otherwise.
+
+``cached_response`` is for polled endpoints whose payload only changes with
+the underlying data. It serializes the payload once per data version and
+compresses it once per encoding, then serves the stored bytes with an
+``ETag``. Each content-coding has its own ETag (``"<hash>"`` for identity,
+``"<hash>-gzip"`` and so on), as strong validators must differ between
+codings. A poll that sends ``If-None-Match`` with the current ETag gets a 304
+without a body.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_SIZE = 1024
+MAX_CACHED_PAYLOADS = 256
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+# Server preference when the client gives several encodings the same q-value.
+# Stored payloads are compressed once, so they use slower, denser levels.
+_ENCODERS: Dict[str, Dict[str, Callable[[bytes], bytes]]] = {
+    "gzip": {
+        "fast": lambda body: gzip.compress(body, compresslevel=5),
+        "dense": lambda body: gzip.compress(body, compresslevel=9),
+    },
+}
+if brotli is not None:
+    _ENCODERS["br"] = {
+        "fast": lambda body: brotli.compress(body, quality=4),
+        "dense": lambda body: brotli.compress(body, quality=9),
+    }
+if zstandard is not None:
+    _ENCODERS["zstd"] = {
+        "fast": lambda body: zstandard.ZstdCompressor(level=3).compress(body),
+        "dense": lambda body: zstandard.ZstdCompressor(level=12).compress(body),
+    }
+PREFERENCE = [name for name in ("zstd", "br", "gzip") if name in _ENCODERS]
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in PREFERENCE:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(body: bytes, encoding: str, dense: bool = False) -> bytes:
+    return _ENCODERS[encoding]["dense" if dense else "fast"](body)
+
+
+def _is_compressible(content_type: str) -> bool:
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+def _coded_etag(etag: bytes, encoding: str) -> bytes:
+    """Give a strong ETag a per-coding suffix; weak ETags already allow any coding."""
+    if etag.startswith(b'"') and etag.endswith(b'"') and len(etag) > 1:
+        return etag[:-1] + b"-" + encoding.encode() + b'"'
+    return etag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match header."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: Callable[..., Any], minimum_size: int = MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {name.lower(): value for name, value in scope.get("headers", [])}
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Dict[str, Any] = {}
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def buffered_send(message: Dict[str, Any]) -> None:
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                response_headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in response_headers or not _is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start.update(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            response_headers = [
+                (name, value) for name, value in start.get("headers", []) if name.lower() != b"content-length"
+            ]
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                response_headers = [
+                    (name, _coded_etag(value, encoding) if name.lower() == b"etag" else value)
+                    for name, value in response_headers
+                ]
+                response_headers.append((b"content-encoding", encoding.encode()))
+                response_headers.append((b"vary", b"Accept-Encoding"))
+            response_headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffered_send)
+
+
+class _EncodedPayload:
+    def __init__(self, version: str, body: bytes) -> None:
+        self.version = version
+        self.body = body
+        self.digest = hashlib.sha1(body).hexdigest()[:16]
+        self._encoded: Dict[str, bytes] = {}
+
+    def etag(self, encoding: Optional[str]) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        payload = self._encoded.get(encoding)
+        if payload is None:
+            payload = compress(self.body, encoding, dense=True)
+            self._encoded[encoding] = payload
+        return payload
+
+
+_PAYLOADS: "OrderedDict[str, _EncodedPayload]" = OrderedDict()
+_LOCK = Lock()
+
+
+def _payload(key: str, version: str, build: Callable[[], Any]) -> _EncodedPayload:
+    with _LOCK:
+        entry = _PAYLOADS.get(key)
+        if entry is not None and entry.version == version:
+            _PAYLOADS.move_to_end(key)
+            return entry
+    content = jsonable_encoder(build())
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    entry = _EncodedPayload(version, body)
+    with _LOCK:
+        _PAYLOADS[key] = entry
+        _PAYLOADS.move_to_end(key)
+        while len(_PAYLOADS) > MAX_CACHED_PAYLOADS:
+            _PAYLOADS.popitem(last=False)
+    return entry
+
+
+def cached_response(request: Request, key: str, version: str, build: Callable[[], Any]) -> Response:
+    """JSON response for ``build()``, serialized and compressed once per ``(key, version)``."""
+    entry = _payload(key, version, build)
+    encoding = negotiate(request.headers.get("accept-encoding")) if len(entry.body) >= MIN_SIZE else None
+    headers = {"ETag": entry.etag(encoding), "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(entry.encoded(encoding), media_type="application/json", headers=headers)
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import forecast, trends, health
+from app.encoding import CompressionMiddleware
+from app.profiling import ProfilingMiddleware
+from app.routes import admin, forecast, historic, recommendations, risk, trends, health
 
 
 app = FastAPI(title="Techfy Demand API")
@@ -13,12 +15,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Opt-in request profiling; inert unless PROFILE_ENABLED or PROFILE_SAMPLE_RATE is set
+app.add_middleware(ProfilingMiddleware)
+# Negotiated gzip/brotli/zstd for JSON responses above encoding.MIN_SIZE
+app.add_middleware(CompressionMiddleware)
 
 
 # Include routers from the `routes` package under /api
 app.include_router(health.router, prefix="/api")
 app.include_router(forecast.router, prefix="/api")
+app.include_router(historic.router, prefix="/api")
+app.include_router(recommendations.router, prefix="/api")
+app.include_router(risk.router, prefix="/api")
 app.include_router(trends.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 
 @app.get("/")
@@ -0,0 +1,244 @@
+"""Opt-in per-request profiling for the hot endpoints.
+
+Profiling is off unless ``PROFILE_ENABLED=1`` or ``PROFILE_SAMPLE_RATE`` > 0.
+When it is on, a request to one of ``PROFILED_PATHS`` is profiled when it
+falls inside the sample rate, using ``PROFILE_MODE`` (``cprofile`` by
+default). It is also profiled if it carries ``X-Profile: cprofile`` (or
+``1``) or ``X-Profile: sample`` together with an ``X-Admin-Token`` equal to
+``PROFILE_ADMIN_TOKEN``. Without that token set, the header is ignored and
+the admin endpoints refuse every request.
+
+``cprofile`` runs the endpoint under cProfile and keeps the pstats.
+``sample`` walks the worker thread's stack every ``PROFILE_SAMPLE_INTERVAL_MS``
+and keeps collapsed stacks for flame graphs. Only one cProfile runs at a
+time; a request that overlaps it is sampled instead. The last ``PROFILE_RING_SIZE``
+profiles stay in memory and are served by ``app.routes.admin``. Profiled
+responses carry an ``X-Profile-Id`` header.
+
+The decision is made in ``ProfilingMiddleware`` and handed to the endpoint
+through a context variable. The endpoint is wrapped with ``@profiled``,
+so sync routes are profiled inside the threadpool worker that runs them.
+"""
+from __future__ import annotations
+
+import cProfile
+import functools
+import hmac
+import io
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Optional
+
+PROFILED_PATHS = {"/api/trends", "/api/sku-mapping", "/api/forecast"}
+PROFILE_HEADER = b"x-profile"
+TOKEN_HEADER = b"x-admin-token"
+MODES = ("cprofile", "sample")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0.0)
+ENABLED = os.environ.get("PROFILE_ENABLED", "").lower() in ("1", "true", "yes") or SAMPLE_RATE > 0
+DEFAULT_MODE = os.environ.get("PROFILE_MODE", "cprofile") if os.environ.get("PROFILE_MODE") in MODES else "cprofile"
+SAMPLE_INTERVAL = _env_float("PROFILE_SAMPLE_INTERVAL_MS", 5.0) / 1000
+RING_SIZE = max(1, int(_env_float("PROFILE_RING_SIZE", 20)))
+ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN") or None
+
+LOGGER = logging.getLogger("profiling")
+if ENABLED and ADMIN_TOKEN is None:
+    LOGGER.warning("profiling: PROFILE_ADMIN_TOKEN is not set; X-Profile and /api/admin/profiles are disabled")
+
+PROFILES: Deque[Dict[str, Any]] = deque(maxlen=RING_SIZE)
+_CPROFILE_LOCK = threading.Lock()
+_PENDING: ContextVar[Optional[Dict[str, Any]]] = ContextVar("profile_request", default=None)
+
+
+class _StackSampler:
+    """Collects collapsed stacks of one thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self) -> "_StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _store(pending: Dict[str, Any], started: float, duration: float, **result: Any) -> None:
+    PROFILES.append(
+        {
+            "id": pending["id"],
+            "path": pending["path"],
+            "query": pending["query"],
+            "mode": pending["mode"],
+            "started_at": started,
+            "duration_ms": round(duration * 1000, 2),
+            **result,
+        }
+    )
+
+
+def _run_sampled(pending: Dict[str, Any], func: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+    started = time.time()
+    clock = time.perf_counter()
+    with _StackSampler(threading.get_ident(), SAMPLE_INTERVAL) as sampler:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _store({**pending, "mode": "sample"}, started, time.perf_counter() - clock, stacks=dict(sampler.stacks))
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Profile a sync endpoint when the middleware flagged the current request."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        pending = _PENDING.get()
+        if pending is None:
+            return func(*args, **kwargs)
+        if pending["mode"] == "sample":
+            return _run_sampled(pending, func, args, kwargs)
+        # Only one cProfile can be active per process (sys.monitoring on
+        # 3.12+), so overlapping requests fall back to stack sampling.
+        if not _CPROFILE_LOCK.acquire(blocking=False):
+            return _run_sampled(pending, func, args, kwargs)
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler outside this module is active.
+                return _run_sampled(pending, func, args, kwargs)
+            started = time.time()
+            clock = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                profiler.create_stats()
+                _store(pending, started, time.perf_counter() - clock, stats=profiler.stats)
+        finally:
+            _CPROFILE_LOCK.release()
+
+    return wrapper
+
+
+def token_matches(token: Optional[str]) -> bool:
+    """True when ``PROFILE_ADMIN_TOKEN`` is set and ``token`` equals it."""
+    if ADMIN_TOKEN is None or token is None:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def _requested_mode(headers: list) -> Optional[str]:
+    values = {name.lower(): value.decode("latin-1").strip() for name, value in headers}
+    value = values.get(PROFILE_HEADER)
+    if value is None or not token_matches(values.get(TOKEN_HEADER)):
+        return None
+    value = value.lower()
+    if value in ("1", "true", "yes"):
+        return DEFAULT_MODE
+    return value if value in MODES else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: Callable[..., Any]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if not ENABLED or scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        mode = _requested_mode(scope.get("headers", []))
+        if mode is None and SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+            mode = DEFAULT_MODE
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-profile-id", profile_id.encode()))
+            await send(message)
+
+        token = _PENDING.set(
+            {
+                "id": profile_id,
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "mode": mode,
+            }
+        )
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _PENDING.reset(token)
+
+
+def find_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    for profile in PROFILES:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+def pstats_text(profile: Dict[str, Any], sort: str = "cumulative", limit: int = 40) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(_StatsHolder(profile["stats"]), stream=stream)
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def pstats_dump(profile: Dict[str, Any]) -> bytes:
+    """The same bytes ``pstats.Stats.dump_stats`` writes, loadable by pstats/snakeviz."""
+    return marshal.dumps(profile["stats"])
+
+
+def collapsed_stacks(profile: Dict[str, Any]) -> str:
+    stacks = profile["stacks"]
+    return "\n".join(f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+
+class _StatsHolder:
+    """Minimal object pstats.Stats accepts in place of a Profile instance."""
+
+    def __init__(self, stats: Dict[Any, Any]) -> None:
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
@@ -0,0 +1,190 @@
+"""Precomputed top-hashtag rankings for the unified signals table.
+
+Rankings are kept per scope (``global``, ``feed:<feed>``, ``sku:<sku>``,
+``source:<source>``, ``day:<YYYY-MM-DD>`` and the rolling ``window:1d`` /
+``window:7d``). The sku, source, day and window scopes are also kept per feed
+as ``feed:<feed>|<scope>``. Each scope holds ``hashtag -> [count, mentions]``
+counters plus a sorted order per metric, so ``top()`` is a slice instead of a
+sort.
+
+``scripts/clean_data.py`` writes ``to_file()`` to
+``cleaned/signal_rankings.json``. When the signals change, rows that were
+appended are merged into the existing counters and only the touched scopes
+are re-sorted; anything else triggers a full rebuild.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from app.data import CLEANED_DIR, SIGNAL_COLUMNS, cached_table, files_version, load_signals, signal_paths
+
+RANKINGS_FILE = CLEANED_DIR / "signal_rankings.json"
+WINDOWS = {"1d": 1, "7d": 7}
+METRICS = {"count": 0, "mentions": 1}
+# Bumped whenever the scope layout changes; older files are rebuilt from the signals.
+FORMAT_VERSION = 2
+
+_LAST: Dict[str, Any] = {}
+
+
+class HashtagRankings:
+    def __init__(self, scopes: Dict[str, Dict[str, List[int]]], latest_date: Optional[str]) -> None:
+        self.scopes = scopes
+        self.latest_date = latest_date
+        self._orders: Dict[tuple[str, str], List[str]] = {}
+        self._refresh_windows()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "HashtagRankings":
+        rankings = cls({}, None)
+        rankings.update(df)
+        return rankings
+
+    @classmethod
+    def from_file(cls, payload: Dict[str, Any]) -> "HashtagRankings":
+        scopes = {
+            scope: {tag: [int(count), int(mentions)] for tag, count, mentions in entries}
+            for scope, entries in payload.get("scopes", {}).items()
+            if "window:" not in scope
+        }
+        return cls(scopes, payload.get("latest_date"))
+
+    def to_file(self) -> Dict[str, Any]:
+        """The ``signal_rankings.json`` payload that ``from_file`` reads back."""
+        return {
+            "format": FORMAT_VERSION,
+            "latest_date": self.latest_date,
+            "scopes": {
+                scope: [[tag, *self.scopes[scope][tag]] for tag in self._order(scope, "mentions")]
+                for scope in self.scopes
+            },
+        }
+
+    def copy(self) -> "HashtagRankings":
+        scopes = {scope: {tag: list(pair) for tag, pair in counters.items()} for scope, counters in self.scopes.items()}
+        clone = HashtagRankings(scopes, self.latest_date)
+        clone._orders.update((key, order) for key, order in self._orders.items() if "window:" not in key[0])
+        return clone
+
+    def update(self, rows: pd.DataFrame) -> None:
+        """Merge new signal rows into the counters and drop stale sort orders."""
+        rows = rows[rows["hashtag"].astype(bool) & rows["date"].notna()]
+        if rows.empty:
+            return
+        keyed = pd.DataFrame(
+            {
+                "hashtag": rows["hashtag"],
+                "mentions": rows["mentions"],
+                "global": "global",
+                "feed": "feed:" + rows["feed"].astype(str),
+                "sku": "sku:" + rows["sku"].astype(str),
+                "source": "source:" + rows["source"].astype(str),
+                "day": "day:" + rows["date"].dt.strftime("%Y-%m-%d"),
+            }
+        )
+        for column in ("sku", "source", "day"):
+            keyed[f"feed_{column}"] = keyed["feed"] + "|" + keyed[column]
+        touched = set()
+        for column in keyed.columns.drop(["hashtag", "mentions"]):
+            grouped = keyed.groupby([column, "hashtag"])["mentions"].agg(["size", "sum"])
+            for (scope, tag), count, mentions in zip(grouped.index, grouped["size"], grouped["sum"]):
+                pair = self.scopes.setdefault(scope, {}).setdefault(tag, [0, 0])
+                pair[0] += int(count)
+                pair[1] += int(mentions)
+                touched.add(scope)
+        latest = rows["date"].max().strftime("%Y-%m-%d")
+        if self.latest_date is None or latest > self.latest_date:
+            self.latest_date = latest
+        self._orders = {key: order for key, order in self._orders.items() if key[0] not in touched}
+        self._refresh_windows()
+
+    def _refresh_windows(self) -> None:
+        for scope in [scope for scope in self.scopes if "window:" in scope]:
+            del self.scopes[scope]
+        self._orders = {key: order for key, order in self._orders.items() if "window:" not in key[0]}
+        if not self.latest_date:
+            return
+        end = pd.Timestamp(self.latest_date)
+        # Windows end at the latest date across all feeds, for every feed.
+        prefixes = [""] + [f"{scope}|" for scope in self.scopes if scope.startswith("feed:") and "|" not in scope]
+        for prefix in prefixes:
+            for name, days in WINDOWS.items():
+                merged: Dict[str, List[int]] = {}
+                for offset in range(days):
+                    day = (end - pd.Timedelta(days=offset)).strftime("%Y-%m-%d")
+                    for tag, (count, mentions) in self.scopes.get(f"{prefix}day:{day}", {}).items():
+                        pair = merged.setdefault(tag, [0, 0])
+                        pair[0] += count
+                        pair[1] += mentions
+                self.scopes[f"{prefix}window:{name}"] = merged
+
+    def _order(self, scope: str, by: str) -> List[str]:
+        key = (scope, by)
+        order = self._orders.get(key)
+        if order is None:
+            counters = self.scopes.get(scope, {})
+            idx = METRICS[by]
+            order = sorted(counters, key=lambda tag: (-counters[tag][idx], tag))
+            self._orders[key] = order
+        return order
+
+    def warm(self, metrics: Iterable[str] = METRICS) -> None:
+        for scope in list(self.scopes):
+            for by in metrics:
+                self._order(scope, by)
+
+    def top(self, scope: str, n: int, by: str = "mentions") -> List[Dict[str, Any]]:
+        counters = self.scopes.get(scope, {})
+        return [
+            {"hashtag": tag, "count": counters[tag][0], "mentions": counters[tag][1]}
+            for tag in self._order(scope, by)[: max(0, n)]
+        ]
+
+    def get(self, scope: str, hashtag: str) -> Optional[Dict[str, Any]]:
+        pair = self.scopes.get(scope, {}).get(hashtag)
+        if pair is None:
+            return None
+        return {"hashtag": hashtag, "count": pair[0], "mentions": pair[1]}
+
+
+def _row_keys(df: pd.DataFrame) -> pd.MultiIndex:
+    return pd.MultiIndex.from_frame(df[SIGNAL_COLUMNS + ["feed"]])
+
+
+def _file_is_fresh() -> bool:
+    if not RANKINGS_FILE.exists():
+        return False
+    built_at = RANKINGS_FILE.stat().st_mtime_ns
+    return all(path.stat().st_mtime_ns <= built_at for path in signal_paths() if path.exists())
+
+
+def _build_rankings() -> HashtagRankings:
+    signals = load_signals()
+    previous = _LAST.get("signals")
+    rankings: Optional[HashtagRankings] = None
+    if previous is not None and previous is not signals:
+        new_keys, old_keys = _row_keys(signals), _row_keys(previous)
+        if old_keys.isin(new_keys).all():
+            rankings = _LAST["rankings"].copy()
+            rankings.update(signals[~new_keys.isin(old_keys)])
+    if rankings is None and previous is None and _file_is_fresh():
+        with RANKINGS_FILE.open(encoding="utf-8") as fh:
+            payload = json.load(fh)
+        if payload.get("format") == FORMAT_VERSION:
+            rankings = HashtagRankings.from_file(payload)
+    if rankings is None:
+        rankings = HashtagRankings.from_frame(signals)
+    rankings.warm()
+    _LAST.update(signals=signals, rankings=rankings)
+    return rankings
+
+
+def rankings_version() -> str:
+    return files_version(signal_paths() + [RANKINGS_FILE])
+
+
+def load_rankings() -> HashtagRankings:
+    return cached_table("rankings", rankings_version(), _build_rankings)
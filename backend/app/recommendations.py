@@ -0,0 +1,109 @@
+"""Reorder recommendations for the whole catalog, computed in one vectorized pass.
+
+For every SKU in a region the forecast matrix from ``app.simulation`` gives
+mean daily demand. Safety stock covers demand variability over the supplier
+lead time at ``SERVICE_Z`` standard deviations. The order quantity tops stock
+up to the horizon's demand plus safety stock. The order-by day is the
+lead time before on-hand stock (less safety stock) runs out. Revenue protected
+is the simulated expected lost units the order covers, times ``SKU_PRICE``.
+SKUs without a row in ``inventory.csv`` get no recommendation; their count is
+kept in ``attrs["skus_without_inventory"]``.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from app.data import GLOBAL_REGION, SKU_PRICE, SKU_TITLES, cached_variant, historic_version, inventory_version
+from app.simulation import forecast_inputs, forecast_matrix, on_hand_units, stockout_risk
+
+LEAD_TIME_DAYS = 5
+SERVICE_Z = 1.65
+URGENT_WITHIN_DAYS = 2
+PRIORITY_RANK = {"urgent": 0, "high": 1, "normal": 2}
+
+
+def _build_recommendations(horizon: int, region: str) -> pd.DataFrame:
+    inputs = forecast_inputs(region)
+    columns = [
+        "sku", "title", "quantity", "order_by", "order_in_days", "on_hand", "forecast_units",
+        "safety_stock", "stockout_probability", "revenue_protected", "priority",
+    ]
+    on_hand = on_hand_units(inputs, region)
+    measured = np.isfinite(on_hand)
+    inputs, on_hand = inputs[measured], on_hand[measured]
+    if inputs.empty:
+        empty = pd.DataFrame(columns=columns)
+        empty.attrs["skus_without_inventory"] = int((~measured).sum())
+        return empty
+
+    mean = forecast_matrix(inputs, horizon)
+    cv = inputs["cv"].to_numpy(dtype="float64")
+    lead = min(LEAD_TIME_DAYS, horizon)
+
+    sigma_lead = cv * np.sqrt((mean[:, :lead] ** 2).sum(axis=1))
+    safety = SERVICE_Z * sigma_lead
+    demand = mean.sum(axis=1)
+    quantity = np.ceil(np.maximum(demand + safety - on_hand, 0.0))
+
+    cumulative = np.cumsum(mean, axis=1)
+    usable = (on_hand - safety)[:, None]
+    runs_out = cumulative[:, -1] > usable[:, 0]
+    cover_days = np.where(runs_out, np.argmax(cumulative > usable, axis=1), horizon)
+    order_in_days = np.maximum(cover_days - lead, 0)
+    start = (inputs["latest"] + pd.Timedelta(days=1)).to_numpy(dtype="datetime64[D]")
+    order_by = start + order_in_days.astype("timedelta64[D]")
+
+    risk = stockout_risk(horizon, region=region).reindex(inputs.index)
+    lost_units = risk["expected_lost_units"].to_numpy(dtype="float64")
+    price = np.array([SKU_PRICE.get(sku, np.nan) for sku in inputs.index], dtype="float64")
+    revenue_protected = np.nan_to_num(np.minimum(quantity, lost_units) * price)
+
+    priority = np.where(
+        quantity <= 0,
+        "none",
+        np.where(order_in_days <= URGENT_WITHIN_DAYS, "urgent", np.where(lost_units > 0, "high", "normal")),
+    )
+    result = pd.DataFrame(
+        {
+            "sku": inputs.index,
+            "title": [SKU_TITLES.get(sku, sku) for sku in inputs.index],
+            "quantity": quantity.astype(int),
+            "order_by": np.datetime_as_string(order_by, unit="D"),
+            "order_in_days": order_in_days.astype(int),
+            "on_hand": on_hand.round(2),
+            "forecast_units": demand.round(2),
+            "safety_stock": safety.round(2),
+            "stockout_probability": risk["stockout_probability"].to_numpy(dtype="float64").round(4),
+            "revenue_protected": revenue_protected.round(2),
+            "priority": priority,
+        }
+    )
+    result = result[result["quantity"] > 0]
+    # Unpriced SKUs protect no revenue, so priority and timing rank first.
+    result = (
+        result.assign(rank=result["priority"].map(PRIORITY_RANK))
+        .sort_values(
+            ["rank", "order_in_days", "revenue_protected", "sku"],
+            ascending=[True, True, False, True],
+            kind="stable",
+        )
+        .drop(columns="rank")
+        .reset_index(drop=True)
+    )
+    result.attrs["skus_without_inventory"] = int((~measured).sum())
+    return result
+
+
+def reorder_recommendations(horizon: int, region: str = GLOBAL_REGION) -> pd.DataFrame:
+    """Recommendations for SKUs that need stock: urgent, high, then normal priority.
+
+    Within a priority the earliest order-by day comes first, then the most
+    revenue protected.
+
+    Cached per forecast version (historic and inventory files), region and horizon.
+    """
+    version = f"{historic_version()}|{inventory_version()}"
+    return cached_variant(
+        f"recommendations|{region}|{horizon}", version, lambda: _build_recommendations(horizon, region)
+    )
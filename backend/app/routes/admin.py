@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from app import profiling
+
+router = APIRouter()
+
+
+def _check_access(token: Optional[str]) -> None:
+    if not profiling.ENABLED:
+        raise HTTPException(status_code=404, detail="profiling is disabled")
+    if profiling.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="PROFILE_ADMIN_TOKEN is not set")
+    if not profiling.token_matches(token):
+        raise HTTPException(status_code=403, detail="invalid admin token")
+
+
+@router.get("/admin/profiles")
+def list_profiles(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    _check_access(x_admin_token)
+    return {
+        "capacity": profiling.RING_SIZE,
+        "profiles": [
+            {key: profile[key] for key in ("id", "path", "query", "mode", "started_at", "duration_ms")}
+            for profile in reversed(profiling.PROFILES)
+        ],
+    }
+
+
+@router.get("/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("text", description="text, pstats or collapsed"),
+    sort: str = Query("cumulative", description="pstats sort key for text output"),
+    limit: int = Query(40, ge=1, le=1_000),
+    x_admin_token: Optional[str] = Header(None),
+) -> Response:
+    _check_access(x_admin_token)
+    profile = profiling.find_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"profile {profile_id} not found")
+
+    if "stacks" in profile:
+        if format not in ("collapsed", "text"):
+            raise HTTPException(status_code=400, detail="sampled profiles are only available as collapsed stacks")
+        return PlainTextResponse(profiling.collapsed_stacks(profile))
+    if format == "pstats":
+        return Response(
+            profiling.pstats_dump(profile),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+        )
+    if format == "text":
+        try:
+            return PlainTextResponse(profiling.pstats_text(profile, sort=sort, limit=limit))
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"unknown sort key {sort}")
+    raise HTTPException(status_code=400, detail="cProfile profiles are available as text or pstats")
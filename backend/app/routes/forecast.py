@@ -5,36 +5,26 @@ import logging
 from typing import Any, Dict, Optional
 
 import pandas as pd
-from fastapi import APIRouter, HTTPException, Query
-from pathlib import Path
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from app.data import GLOBAL_REGION, SKU_PRICE, historic_regions, historic_version, inventory_version
+from app.encoding import cached_response
+from app.profiling import profiled
+from app.simulation import forecast_inputs, sku_stockout_risk
 
 router = APIRouter()
-DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 CACHE: Dict[str, Dict[str, Any]] = {}
 LOGGER = logging.getLogger("forecast")
 TTL_SECONDS = 86_400
-SKU_PRICE = {
-    "GS-019": 280.0,
-    "BL-101": 190.0,
-    "GS-045": 140.0,
-}
-
-
-def _load_historic() -> pd.DataFrame:
-    cleaned_dir = DATA_DIR / "cleaned"
-    parquet_path = cleaned_dir / "historic.parquet"
-    if parquet_path.exists():
-        df = pd.read_parquet(parquet_path)
-    else:
-        df = pd.read_csv(DATA_DIR / "historic.csv", parse_dates=["date"])
-    df = df.dropna(subset=["date", "sku"])
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df[df["date"].notna()]
-    return df
+
+
+def _data_version() -> str:
+    # Stockout risk depends on inventory.csv as well as the historic data.
+    return f"{historic_version()}|{inventory_version()}"
 
 
 def _cache_key(sku: str, horizon: int, region: str, start_date: str) -> str:
-    return f"{sku}|{horizon}|{region}|{start_date}"
+    return f"{sku}|{horizon}|{region}|{start_date}|{_data_version()}"
 
 
 def _get_from_cache(key: str) -> Optional[Dict[str, Any]]:
@@ -61,33 +51,25 @@ def _ensure_sku_exists(df: pd.DataFrame, sku: str) -> pd.DataFrame:
     return subset
 
 
-def _build_weekday_multipliers(df: pd.DataFrame) -> Dict[int, float]:
-    df = df.copy()
-    df["weekday"] = df["date"].dt.weekday
-    overall_mean = df["units"].mean() or 1.0
-    daily = df.groupby("weekday")["units"].mean().fillna(overall_mean).to_dict()
-    multipliers = {
-        weekday: round(value / overall_mean, 2) if overall_mean else 1.0
-        for weekday, value in daily.items()
-    }
-    for wd in range(7):
-        multipliers.setdefault(wd, 1.0)
-    return multipliers
+def _ensure_region_exists(region: str) -> pd.DataFrame:
+    regions = historic_regions()
+    if region not in regions:
+        raise HTTPException(status_code=404, detail=f"Region {region} not found in historic data")
+    return regions[region]
 
 
-def _rolling_mean(df: pd.DataFrame, window: int = 28) -> float:
-    latest = df["date"].max()
-    start = latest - timedelta(days=window - 1)
-    subset = df[(df["date"] >= start) & (df["date"] <= latest)]
-    return float(subset["units"].mean() or 1.0)
+def _model_inputs(sku: str, region: str) -> tuple[float, Dict[int, float]]:
+    """Rolling mean and weekday multipliers precomputed for every (region, SKU)."""
+    row = forecast_inputs(region).loc[sku]
+    multipliers = {weekday: float(row[weekday]) for weekday in range(7)}
+    return float(row["rolling_mean"]), multipliers
 
 
 def _format_series(df: pd.DataFrame, limit: int) -> list[Dict[str, Any]]:
     df = df.sort_values("date").tail(limit)
-    return [
-        {"date": row["date"].strftime("%Y-%m-%d"), "units": float(row["units"]) }
-        for _, row in df.iterrows()
-    ]
+    dates = df["date"].dt.strftime("%Y-%m-%d").tolist()
+    units = df["units"].astype(float).tolist()
+    return [{"date": date, "units": value} for date, value in zip(dates, units)]
 
 
 def _generate_forecast_points(
@@ -117,15 +99,21 @@ def _build_confidence_intervals(points: list[Dict[str, Any]]) -> Dict[str, list[
     return intervals
 
 
-def _aggregate_metrics(points: list[Dict[str, Any]], horizon: int) -> Dict[str, Any]:
+def _aggregate_metrics(points: list[Dict[str, Any]], horizon: int, sku: str, region: str) -> Dict[str, Any]:
     expected_units = sum(point["units"] for point in points)
-    avg_price = 280.0
-    expected_revenue = round(expected_units * avg_price, 2)
-    stockout_risk = min(50.0, max(5.0, 10.0 + horizon * 0.5))
+    price = SKU_PRICE.get(sku)
+    expected_revenue = round(expected_units * price, 2) if price else None
+    risk = sku_stockout_risk(sku, horizon, region)
+    # Without an inventory row there is nothing to simulate against.
+    if risk is None or pd.isna(risk["stockout_probability"]):
+        stockout_risk, source = _fallback_stockout_risk(horizon), "heuristic"
+    else:
+        stockout_risk, source = float(risk["stockout_probability"]) * 100, "simulation"
     return {
         "expected_units": round(expected_units, 2),
         "expected_revenue": expected_revenue,
         "stockout_risk_pct": round(stockout_risk, 2),
+        "stockout_risk_source": source,
     }
 
 
@@ -170,14 +158,8 @@ def _parse_start_date(value: Optional[str], default: pd.Timestamp) -> pd.Timesta
     return parsed.normalize()
 
 
-@router.get("/forecast")
-def forecast(
-    sku: str = Query(..., description="SKU identifier"),
-    horizon: int = Query(14, description="Forecast horizon in days", ge=7, le=30),
-    region: str = Query("global", description="Region for the forecast"),
-    start_date: Optional[str] = Query(None, description="Optional start date (YYYY-MM-DD)"),
-) -> Dict[str, Any]:
-    historic_df = _load_historic()
+def _build_forecast(sku: str, horizon: int, region: str, start_date: Optional[str]) -> Dict[str, Any]:
+    historic_df = _ensure_region_exists(region)
     filtered = _ensure_sku_exists(historic_df, sku)
     latest = filtered["date"].max()
     data_window = {
@@ -193,15 +175,14 @@ def forecast(
     if cached:
         return cached
 
-    multipliers = _build_weekday_multipliers(filtered)
-    rolling_mean = _rolling_mean(filtered)
+    rolling_mean, multipliers = _model_inputs(sku, region)
     points = _generate_forecast_points(start_ts, horizon, rolling_mean, multipliers)
     if len(points) != horizon:
         LOGGER.error("forecast: generated %s points for horizon %s", len(points), horizon)
     intervals = _build_confidence_intervals(points)
     serialized_points = _serialize_points(points)
     historical = _format_series(filtered, max(28, horizon))
-    metrics = _aggregate_metrics(points, horizon)
+    metrics = _aggregate_metrics(points, horizon, sku, region)
 
     response = {
         "sku": sku,
@@ -229,3 +210,23 @@ def forecast(
 
     _store_cache(cache_key, response)
     return response
+
+
+@router.get("/forecast")
+@profiled
+def forecast(
+    request: Request,
+    sku: str = Query(..., description="SKU identifier"),
+    horizon: int = Query(14, description="Forecast horizon in days", ge=7, le=30),
+    region: str = Query(GLOBAL_REGION, description="Region for the forecast; global sums all regions"),
+    start_date: Optional[str] = Query(None, description="Optional start date (YYYY-MM-DD)"),
+) -> Response:
+    # The encoded payload follows the same data version and TTL as CACHE.
+    ttl_bucket = int(pd.Timestamp.now().timestamp() // TTL_SECONDS)
+    version = f"{_data_version()}|{ttl_bucket}"
+    return cached_response(
+        request,
+        "forecast|" + _cache_key(sku, horizon, region, start_date or ""),
+        version,
+        lambda: _build_forecast(sku, horizon, region, start_date),
+    )
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
+
+from app.data import GLOBAL_REGION, historic_regions, historic_series
+
+router = APIRouter()
+DOWNSAMPLE_METHODS = ("lttb", "bucket")
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[np.datetime64]:
+    if not value:
+        return None
+    try:
+        parsed = pd.to_datetime(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
+    return np.datetime64(parsed.normalize().date(), "D")
+
+
+def _slice_range(
+    dates: np.ndarray,
+    units: np.ndarray,
+    start: Optional[np.datetime64],
+    end: Optional[np.datetime64],
+) -> tuple[np.ndarray, np.ndarray]:
+    lo = int(np.searchsorted(dates, start, side="left")) if start is not None else 0
+    hi = int(np.searchsorted(dates, end, side="right")) if end is not None else len(dates)
+    return dates[lo:hi], units[lo:hi]
+
+
+def _bucket_mean(dates: np.ndarray, units: np.ndarray, points: int) -> tuple[np.ndarray, np.ndarray]:
+    """Average fixed-width buckets, labelled by the first date in each bucket."""
+    edges = np.linspace(0, len(units), points + 1).astype(np.int64)
+    starts = edges[:-1]
+    sums = np.add.reduceat(units, starts)
+    counts = np.diff(edges)
+    return dates[starts], sums / counts
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of the points that keep the visual shape."""
+    n = len(y)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    anchor = 0
+    for bucket in range(points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_lo, next_hi = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        ax, ay = x[anchor], y[anchor]
+        area = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y - ay))
+        anchor = lo + int(np.argmax(area))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def _downsample(
+    dates: np.ndarray, units: np.ndarray, points: Optional[int], method: str
+) -> tuple[np.ndarray, np.ndarray]:
+    if not points or points >= len(units):
+        return dates, units
+    if method == "bucket":
+        return _bucket_mean(dates, units, points)
+    idx = _lttb_indices(dates.astype(np.int64).astype(np.float64), units, points)
+    return dates[idx], units[idx]
+
+
+@router.get("/historic")
+def historic(
+    sku: str = Query(..., description="SKU identifier"),
+    region: str = Query(GLOBAL_REGION, description="Region; global sums all regions"),
+    start: Optional[str] = Query(None, description="Inclusive start date (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Inclusive end date (YYYY-MM-DD)"),
+    points: Optional[int] = Query(None, description="Downsample to at most this many points", ge=3, le=10_000),
+    method: str = Query("lttb", description="Downsampling method: lttb or bucket"),
+) -> Dict[str, Any]:
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail="method must be one of lttb or bucket")
+    series = historic_series().get((region, sku))
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"SKU {sku} not found in historic data for region {region}")
+
+    start_day = _parse_date(start, "start")
+    end_day = _parse_date(end, "end")
+    if start_day is not None and end_day is not None and start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    dates, units = _slice_range(*series, start_day, end_day)
+    total = len(units)
+    window = {"start": str(dates[0]), "end": str(dates[-1])} if total else {"start": None, "end": None}
+    dates, units = _downsample(dates, units, points, method)
+    return {
+        "sku": sku,
+        "region": region,
+        **window,
+        "method": method if points and points < total else "raw",
+        "total_points": total,
+        "returned_points": len(units),
+        "dates": np.datetime_as_string(dates, unit="D").tolist(),
+        "values": np.round(units, 2).tolist(),
+    }
+
+
+@router.get("/regions")
+def regions() -> Dict[str, Any]:
+    stored = sorted(region for region in historic_regions() if region != GLOBAL_REGION)
+    return {"regions": [GLOBAL_REGION] + stored}
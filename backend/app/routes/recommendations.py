@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.data import GLOBAL_REGION, historic_regions
+from app.recommendations import reorder_recommendations
+
+router = APIRouter()
+
+
+@router.get("/recommendations")
+def recommendations(
+    region: str = Query(GLOBAL_REGION, description="Region; global sums all regions"),
+    horizon: int = Query(30, description="Days of demand the order should cover", ge=7, le=90),
+    page: int = Query(1, description="1-based page number", ge=1),
+    page_size: int = Query(50, description="Recommendations per page", ge=1, le=1_000),
+) -> Dict[str, Any]:
+    if region not in historic_regions():
+        raise HTTPException(status_code=404, detail=f"Region {region} not found in historic data")
+    table = reorder_recommendations(horizon, region)
+    offset = (page - 1) * page_size
+    items = [
+        {
+            "id": f"{region}:{row['sku']}",
+            "skuId": row["sku"],
+            "skuName": row["title"],
+            "action": "reorder",
+            "quantity": int(row["quantity"]),
+            "orderBy": row["order_by"],
+            "orderInDays": int(row["order_in_days"]),
+            "onHand": float(row["on_hand"]),
+            "forecastUnits": float(row["forecast_units"]),
+            "safetyStock": float(row["safety_stock"]),
+            "stockoutProbability": float(row["stockout_probability"]),
+            "revenueProtected": float(row["revenue_protected"]),
+            "priority": row["priority"],
+            "status": "drafted",
+        }
+        for row in table.iloc[offset : offset + page_size].to_dict(orient="records")
+    ]
+    return {
+        "region": region,
+        "horizon": horizon,
+        "page": page,
+        "page_size": page_size,
+        "total": int(len(table)),
+        "totals": {
+            "quantity": int(table["quantity"].sum()),
+            "revenue_protected": round(float(table["revenue_protected"].sum()), 2),
+            "skus_without_inventory": table.attrs.get("skus_without_inventory", 0),
+        },
+        "items": items,
+    }
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
+
+from app.data import GLOBAL_REGION, historic_regions
+from app.simulation import DEFAULT_PATHS, MAX_PATH_DAYS, stockout_risk
+
+router = APIRouter()
+AT_RISK_PROBABILITY = 0.5
+
+
+def _optional_round(value: Any, digits: int = 2) -> Any:
+    return None if pd.isna(value) else round(float(value), digits)
+
+
+@router.get("/stockout-risk")
+def stockout_risk_summary(
+    horizon: int = Query(14, description="Simulation horizon in days", ge=1, le=90),
+    paths: int = Query(DEFAULT_PATHS, description="Monte Carlo paths per SKU", ge=100, le=20_000),
+    region: str = Query(GLOBAL_REGION, description="Region; global sums all regions"),
+) -> Dict[str, Any]:
+    if paths * horizon > MAX_PATH_DAYS:
+        raise HTTPException(status_code=400, detail=f"paths x horizon must be at most {MAX_PATH_DAYS:,}")
+    if region not in historic_regions():
+        raise HTTPException(status_code=404, detail=f"Region {region} not found in historic data")
+    risk = stockout_risk(horizon, paths, region).sort_values("revenue_at_risk", ascending=False, na_position="last")
+    skus = [
+        {
+            "sku": sku,
+            "on_hand": _optional_round(row["on_hand"]),
+            "on_hand_source": row["on_hand_source"],
+            "expected_units": round(float(row["expected_units"]), 2),
+            "stockout_probability": _optional_round(row["stockout_probability"], 4),
+            "expected_days_to_stockout": _optional_round(row["expected_days_to_stockout"]),
+            "expected_lost_units": _optional_round(row["expected_lost_units"]),
+            "revenue_at_risk": _optional_round(row["revenue_at_risk"]),
+        }
+        for sku, row in risk.iterrows()
+    ]
+    at_risk = risk[risk["stockout_probability"] >= AT_RISK_PROBABILITY]
+    return {
+        "region": region,
+        "horizon": horizon,
+        "paths": paths,
+        "skus": skus,
+        "totals": {
+            "skus_at_risk": int(len(at_risk)),
+            "skus_without_inventory": int((risk["on_hand_source"] == "missing").sum()),
+            "revenue_at_risk": round(float(risk["revenue_at_risk"].sum()), 2),
+        },
+    }
@@ -1,81 +1,31 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 import pandas as pd
-from pathlib import Path
 
-router = APIRouter()
-DATA_DIR = Path(__file__).resolve().parents[2] / 'data'
-GOOGLE_SIGNALS_FILE = DATA_DIR / 'google_signals.csv'
+from app.data import (
+    SKU_TITLES,
+    historic_version,
+    inventory_version,
+    load_historic,
+    load_signals,
+    signals_version,
+)
+from app.encoding import cached_response
+from app.profiling import profiled
+from app.rankings import WINDOWS, load_rankings, rankings_version
+from app.simulation import stockout_risk
 
-SKU_TITLES = {
-    'GS-019': 'Electric Kettle',
-    'BL-101': 'High-speed Blender',
-    'GS-045': 'Premium Mug',
-    'VDJ-045': 'Vintage Denim Jacket',
-    'PDE-112': 'Freshwater Pearl Earrings',
-    'LCB-089': 'Leather Crossbody',
-    'CBS-067': 'Cashmere Sweater',
-}
+router = APIRouter()
+STOCKOUT_HORIZON = 14
 
 
 def _load_social() -> pd.DataFrame:
-    cleaned_dir = DATA_DIR / 'cleaned'
-    parquet_path = cleaned_dir / 'social.parquet'
-    if parquet_path.exists():
-        df = pd.read_parquet(parquet_path)
-    else:
-        df = pd.read_csv(DATA_DIR / 'social.csv', parse_dates=['date']).fillna('')
-
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    else:
-        df['date'] = pd.Timestamp.now()
-
-    if 'hashtag' not in df.columns:
-        df['hashtag'] = ''
-    df['title_hashtag'] = df['hashtag'].astype(str).fillna('').str.strip()
-
-    if 'sku' not in df.columns:
-        df['sku'] = 'UNKNOWN'
-    else:
-        df['sku'] = df['sku'].astype(str).fillna('UNKNOWN')
-    df['sku'] = df['sku'].replace({'': 'UNKNOWN'})
-
-    if 'source' not in df.columns:
-        df['source'] = 'social'
-    else:
-        df['source'] = df['source'].astype(str).fillna('social')
-    df['source'] = df['source'].replace({'': 'social'})
-
-    if 'mentions' not in df.columns:
-        df['mentions'] = 0
-    df['mentions'] = pd.to_numeric(df['mentions'], errors='coerce').fillna(0).astype(int)
-    return df
+    signals = load_signals()
+    return signals[signals['feed'] == 'social'].drop(columns='feed').reset_index(drop=True)
 
 
 def _load_google_signals() -> pd.DataFrame:
-    if not GOOGLE_SIGNALS_FILE.exists():
-        return pd.DataFrame(
-            columns=['date', 'hashtag', 'mentions', 'source', 'sku', 'post_id', 'text', 'keyword']
-        )
-    df = pd.read_csv(GOOGLE_SIGNALS_FILE, parse_dates=['date']).fillna('')
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    if 'source' not in df.columns:
-        df['source'] = 'google'
-    else:
-        df['source'] = df['source'].astype(str).fillna('google')
-    df['mentions'] = pd.to_numeric(df['mentions'], errors='coerce').fillna(0).astype(int)
-    return df
-
-
-def _load_historic() -> pd.DataFrame:
-    cleaned_dir = DATA_DIR / 'cleaned'
-    parquet_path = cleaned_dir / 'historic.parquet'
-    if parquet_path.exists():
-        df = pd.read_parquet(parquet_path)
-    else:
-        df = pd.read_csv(DATA_DIR / 'historic.csv', parse_dates=['date'])
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    return df
+    signals = load_signals()
+    return signals[signals['feed'] == 'google'].drop(columns='feed').reset_index(drop=True)
 
 
 def _pct_change(current: int, previous: int) -> int:
@@ -105,14 +55,8 @@ def _window_mentions_for_keyword(df: pd.DataFrame, keyword: str, days: int, offs
     return int(df.loc[mask, 'mentions'].sum())
 
 
-def _sku_keywords(df: pd.DataFrame, sku: str) -> list[str]:
-    subset = df[(df['sku'] == sku) & df['title_hashtag'].astype(bool)]
-    if subset.empty:
-        return []
-    summary = (
-        subset.groupby('title_hashtag')['mentions'].sum().sort_values(ascending=False).head(3)
-    )
-    return summary.index.to_list()
+def _sku_keywords(sku: str) -> list[str]:
+    return [entry['hashtag'] for entry in load_rankings().top(f'sku:{sku}', 3, by='mentions')]
 
 
 def _sku_source_breakdown(df: pd.DataFrame, sku: str) -> list[dict]:
@@ -123,7 +67,7 @@ def _sku_source_breakdown(df: pd.DataFrame, sku: str) -> list[dict]:
     return [{'source': source, 'mentions': int(count)} for source, count in carriers.items()]
 
 
-def _estimate_stockout(avg_units: float, trend_spike: int) -> str:
+def _heuristic_stockout(avg_units: float, trend_spike: int) -> str:
     if not avg_units or avg_units <= 0:
         return 'Unknown'
     if trend_spike >= 150:
@@ -135,6 +79,26 @@ def _estimate_stockout(avg_units: float, trend_spike: int) -> str:
     return '3 days'
 
 
+def _is_simulated(risk: pd.DataFrame, sku: str) -> bool:
+    return sku in risk.index and risk.loc[sku, 'on_hand_source'] == 'inventory'
+
+
+def _estimate_stockout(risk: pd.DataFrame, sku: str) -> str:
+    row = risk.loc[sku]
+    days = row['expected_days_to_stockout']
+    if row['stockout_probability'] < 0.5 or pd.isna(days):
+        return f'{STOCKOUT_HORIZON}+ days'
+    if days < 2:
+        return f'{max(1, int(round(days * 24)))} hours'
+    return f'{int(round(days))} days'
+
+
+def _revenue_at_risk(risk: pd.DataFrame, sku: str) -> int:
+    if pd.isna(risk.loc[sku, 'revenue_at_risk']):
+        return 0
+    return max(0, int(risk.loc[sku, 'revenue_at_risk']))
+
+
 def _build_sku_mappings(social_df: pd.DataFrame, historic_df: pd.DataFrame) -> list[dict]:
     if social_df.empty and historic_df.empty:
         return []
@@ -144,6 +108,7 @@ def _build_sku_mappings(social_df: pd.DataFrame, historic_df: pd.DataFrame) -> l
     baseline = max(1, int(social_df['mentions'].median()) if not social_df.empty else 50)
     result = []
     now = social_df['date'].max() if not social_df.empty else pd.Timestamp.now()
+    risk = stockout_risk(STOCKOUT_HORIZON)
 
     for sku in sorted(skus):
         hist_subset = historic_df[historic_df['sku'] == sku]
@@ -160,9 +125,14 @@ def _build_sku_mappings(social_df: pd.DataFrame, historic_df: pd.DataFrame) -> l
         trend_spike = min(999, int(((mentions_total + 1) / baseline) * 100))
         score = min(0.98, 0.2 + (avg_units / 200) + (mentions_total / max(1, mentions_total + 300)))
         confidence = int(max(20, min(100, score * 100)))
-        time_to_stockout = _estimate_stockout(avg_units, trend_spike)
-        revenue_at_risk = max(0, int((1 - (confidence / 100)) * 200_000))
-        keywords = _sku_keywords(social_df, sku)
+        # SKUs without inventory keep the pre-simulation estimates.
+        if _is_simulated(risk, sku):
+            time_to_stockout = _estimate_stockout(risk, sku)
+            revenue_at_risk = _revenue_at_risk(risk, sku)
+        else:
+            time_to_stockout = _heuristic_stockout(avg_units, trend_spike)
+            revenue_at_risk = max(0, int((1 - (confidence / 100)) * 200_000))
+        keywords = _sku_keywords(sku)
         status = (
             'action_required'
             if trend_spike > 150 or change24 > 50
@@ -240,27 +210,35 @@ def _build_signal_sources(df: pd.DataFrame) -> list[dict]:
 
 
 @router.get('/trends')
+@profiled
 def trends():
-    social_df = _load_social()
-    historic_df = _load_historic()
-    mappings = _build_sku_mappings(social_df, historic_df)
+    signals_df = load_signals()
+    historic_df = load_historic()
+    mappings = _build_sku_mappings(signals_df, historic_df)
     return {
         'trending_skus': mappings[:5],
-        'trend_keywords': _build_keyword_trends(social_df),
-        'signal_sources': _build_signal_sources(social_df),
+        'trend_keywords': _build_keyword_trends(signals_df),
+        'signal_sources': _build_signal_sources(signals_df),
         'last_updated': pd.Timestamp.now().isoformat(),
     }
 
 
+def _mapping_version() -> str:
+    return f'{rankings_version()}|{historic_version()}|{inventory_version()}'
+
+
 @router.get('/sku-mapping')
-def sku_mapping():
-    social_df = _load_social()
-    historic_df = _load_historic()
-    return {'mappings': _build_sku_mappings(social_df, historic_df)}
+@profiled
+def sku_mapping(request: Request):
+    return cached_response(
+        request,
+        'sku-mapping',
+        _mapping_version(),
+        lambda: {'mappings': _build_sku_mappings(load_signals(), load_historic())},
+    )
 
 
-@router.get('/signals')
-def signals():
+def _signal_rows() -> list[dict]:
     df = _load_social()
     rows = []
     for i, r in df.iterrows():
@@ -276,8 +254,12 @@ def signals():
     return rows
 
 
-@router.get('/signals/google')
-def google_signals():
+@router.get('/signals')
+def signals(request: Request):
+    return cached_response(request, 'signals', signals_version(), _signal_rows)
+
+
+def _google_signal_rows() -> list[dict]:
     df = _load_google_signals()
     rows = []
     for i, r in df.iterrows():
@@ -294,30 +276,70 @@ def google_signals():
     return rows
 
 
-@router.get('/social')
-def social(hashtag: str = None, top_n: int = 10):
+@router.get('/signals/google')
+def google_signals(request: Request):
+    return cached_response(request, 'signals/google', signals_version(), _google_signal_rows)
+
+
+def _social_payload(hashtag: str, top_n: int, sku: str, source: str, window: str) -> dict:
     df = _load_social()
+    rankings = load_rankings()
+    filters = {'sku': sku, 'source': source, 'window': window}
+    if sku:
+        df = df[df['sku'] == sku]
+    if source:
+        df = df[df['source'] == source]
+    if window and rankings.latest_date:
+        # Same span as the window:<name> ranking scopes.
+        start = pd.Timestamp(rankings.latest_date) - pd.Timedelta(days=WINDOWS[window])
+        df = df[df['date'] > start]
+    active = [(name, value) for name, value in filters.items() if value]
+    if hashtag:
+        df = df[df['hashtag'] == hashtag]
     rows = df.to_dict(orient='records')
+
+    if len(active) > 1:
+        # No precomputed scope for combined filters; rank the filtered rows.
+        ranked = df[df['hashtag'].astype(bool) & df['date'].notna()]
+        grouped = ranked.groupby('hashtag')['mentions'].agg(['size', 'sum'])
+        top = [
+            {'hashtag': tag, 'count': int(count), 'mentions': int(mentions)}
+            for tag, count, mentions in zip(grouped.index, grouped['size'], grouped['sum'])
+        ]
+        top = sorted(top, key=lambda entry: (-entry['count'], entry['hashtag']))
+        return {'rows': rows, 'top_hashtags': top if hashtag else top[: max(0, top_n)]}
+
+    scope = 'feed:social' + ''.join(f'|{name}:{value}' for name, value in active)
     if hashtag:
-        rows = [row for row in rows if row.get('hashtag') == hashtag]
-    top = []
-    if rows:
-        hashtags = pd.DataFrame(rows)
-        if 'hashtag' in hashtags.columns and not hashtags['hashtag'].empty:
-            top = (
-                hashtags['hashtag']
-                .value_counts()
-                .head(top_n)
-                .rename_axis('hashtag')
-                .reset_index(name='count')
-                .to_dict(orient='records')
-            )
+        entry = rankings.get(scope, hashtag)
+        top = [entry] if entry else []
+    else:
+        top = rankings.top(scope, top_n, by='count')
     return {'rows': rows, 'top_hashtags': top}
 
 
+@router.get('/social')
+def social(
+    request: Request,
+    hashtag: str = None,
+    top_n: int = 10,
+    sku: str = None,
+    source: str = None,
+    window: str = None,
+):
+    if window and window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(WINDOWS)}")
+    return cached_response(
+        request,
+        f'social|{hashtag}|{top_n}|{sku}|{source}|{window}',
+        rankings_version(),
+        lambda: _social_payload(hashtag, top_n, sku, source, window),
+    )
+
+
 @router.get('/sources')
 def sources():
-    df = _load_social()
+    df = load_signals()
     return (
         df.groupby('source')['mentions']
         .sum()
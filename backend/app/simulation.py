@@ -0,0 +1,181 @@
+"""Vectorized Monte Carlo stockout simulation for the whole catalog.
+
+Daily demand for every SKU follows the same stub model as ``/api/forecast``
+(28-day rolling mean times a weekday multiplier). Each simulated day is drawn
+from a gamma distribution with that mean and the SKU's recent coefficient of
+variation, giving a ``(SKU x path x day)`` array that is reduced to stockout
+probability, expected time to stockout and revenue at risk. SKUs are processed
+in chunks so the working arrays of one chunk stay within ``CHUNK_BYTES``.
+
+Every region (and the ``global`` cross-region totals) is simulated
+separately. Units on hand come from ``data/inventory.csv``. SKUs without an
+inventory row are not simulated: their metrics are NaN and ``on_hand_source``
+is ``"missing"``, so callers can tell a measured risk from no data.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.data import (
+    GLOBAL_REGION,
+    SKU_PRICE,
+    cached_table,
+    cached_variant,
+    historic_regions,
+    historic_version,
+    inventory_version,
+    load_inventory,
+)
+
+DEFAULT_PATHS = 1_000
+# paths x horizon limit for requested simulations: the cost of the default
+# path count at the longest horizon /api/recommendations allows.
+MAX_PATH_DAYS = DEFAULT_PATHS * 90
+CHUNK_BYTES = 64 * 1024 * 1024
+# Live per simulated day in _simulate_chunk: float32 draws, float32 cumulative
+# demand and the bool stockout mask.
+BYTES_PER_DRAW = 2 * np.dtype(np.float32).itemsize + np.dtype(np.bool_).itemsize
+ROLLING_WINDOW = 28
+DEFAULT_CV = 0.3
+MIN_CV = 0.05
+SEED = 7
+
+
+def _build_forecast_inputs() -> Dict[str, pd.DataFrame]:
+    df = pd.concat(historic_regions().values(), ignore_index=True)
+    if df.empty:
+        return {}
+    keys = ["region", "sku"]
+    latest = df.groupby(keys)["date"].transform("max")
+    recent = df[df["date"] >= latest - pd.Timedelta(days=ROLLING_WINDOW - 1)]
+    grouped = recent.groupby(keys)["units"]
+    rolling = grouped.mean()
+    cv = (grouped.std(ddof=0) / rolling).replace([np.inf, -np.inf], np.nan)
+
+    overall = df.groupby(keys)["units"].mean()
+    by_weekday = df.groupby(keys + [df["date"].dt.weekday])["units"].mean().unstack()
+    by_weekday = by_weekday.reindex(columns=range(7))
+    multipliers = by_weekday.div(overall.where(overall != 0), axis=0).round(2).fillna(1.0)
+
+    inputs = pd.DataFrame(
+        {
+            "latest": df.groupby(keys)["date"].max(),
+            "rolling_mean": rolling.where(rolling > 0, 1.0).fillna(1.0),
+            "cv": cv.fillna(DEFAULT_CV).clip(lower=MIN_CV),
+        }
+    ).join(multipliers)
+    return {
+        str(region): frame.droplevel("region")
+        for region, frame in inputs.groupby(level="region", sort=False)
+    }
+
+
+def forecast_inputs(region: str = GLOBAL_REGION) -> pd.DataFrame:
+    """Per-SKU rolling mean, demand CV and weekday multipliers (columns 0-6) for ``region``.
+
+    All regions, including the ``global`` totals, are computed in one grouped
+    pass per data version.
+    """
+    inputs = cached_table("forecast_inputs", historic_version(), _build_forecast_inputs)
+    frame = inputs.get(region)
+    if frame is None:
+        return pd.DataFrame(columns=["latest", "rolling_mean", "cv"] + list(range(7)))
+    return frame
+
+
+def forecast_matrix(inputs: pd.DataFrame, horizon: int) -> np.ndarray:
+    """Mean daily demand, shape ``(SKU, horizon)``, starting the day after each SKU's last sale."""
+    if inputs.empty:
+        return np.zeros((0, horizon))
+    start_weekday = (inputs["latest"] + pd.Timedelta(days=1)).dt.weekday.to_numpy()
+    weekdays = (start_weekday[:, None] + np.arange(horizon)[None, :]) % 7
+    multipliers = inputs[list(range(7))].to_numpy(dtype="float64")
+    rows = np.arange(len(inputs))[:, None]
+    mean = inputs["rolling_mean"].to_numpy(dtype="float64")[:, None] * multipliers[rows, weekdays]
+    return np.maximum(1.0, mean)
+
+
+def on_hand_units(inputs: pd.DataFrame, region: str) -> np.ndarray:
+    """Units on hand per row of ``inputs``; NaN where ``inventory.csv`` has no row."""
+    inventory = load_inventory()
+    return np.array([inventory.get((region, sku), np.nan) for sku in inputs.index], dtype="float64")
+
+
+def _simulate_chunk(
+    rng: np.random.Generator,
+    mean: np.ndarray,
+    cv: np.ndarray,
+    on_hand: np.ndarray,
+    paths: int,
+) -> dict[str, np.ndarray]:
+    skus, horizon = mean.shape
+    shape = (1.0 / cv**2).astype(np.float32)[:, None, None]
+    scale = (mean * cv[:, None] ** 2).astype(np.float32)[:, None, :]
+    draws = rng.standard_gamma(np.broadcast_to(shape, (skus, paths, horizon)), dtype=np.float32)
+    np.multiply(draws, scale, out=draws)
+    cumulative = np.cumsum(draws, axis=2)
+    limit = on_hand.astype(np.float32)[:, None, None]
+
+    stocked_out = cumulative[:, :, -1] > limit[:, :, 0]
+    first_day = np.argmax(cumulative > limit, axis=2)
+    day_demand = np.take_along_axis(draws, first_day[:, :, None], axis=2)[:, :, 0]
+    before = np.take_along_axis(cumulative, first_day[:, :, None], axis=2)[:, :, 0] - day_demand
+    fraction = np.clip((limit[:, :, 0] - before) / np.maximum(day_demand, 1e-6), 0.0, 1.0)
+    days_to_stockout = np.where(stocked_out, first_day + fraction, np.nan)
+
+    stockouts = stocked_out.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        expected_days = np.where(stockouts > 0, np.nansum(days_to_stockout, axis=1) / np.maximum(stockouts, 1), np.nan)
+    return {
+        "stockout_probability": stockouts / paths,
+        "expected_days_to_stockout": expected_days,
+        "expected_lost_units": np.maximum(cumulative[:, :, -1] - limit[:, :, 0], 0.0).mean(axis=1),
+    }
+
+
+def _run_simulation(horizon: int, paths: int, region: str) -> pd.DataFrame:
+    inputs = forecast_inputs(region)
+    mean = forecast_matrix(inputs, horizon)
+    skus = inputs.index.to_list()
+    on_hand = on_hand_units(inputs, region)
+    cv = inputs["cv"].to_numpy(dtype="float64")
+    measured = np.flatnonzero(np.isfinite(on_hand))
+
+    rng = np.random.default_rng(SEED)
+    per_sku_bytes = paths * horizon * BYTES_PER_DRAW
+    step = max(1, CHUNK_BYTES // max(1, per_sku_bytes))
+    metrics = {
+        key: np.full(len(skus), np.nan)
+        for key in ("stockout_probability", "expected_days_to_stockout", "expected_lost_units")
+    }
+    for lo in range(0, len(measured), step):
+        rows = measured[lo : lo + step]
+        chunk = _simulate_chunk(rng, mean[rows], cv[rows], on_hand[rows], paths)
+        for key, values in chunk.items():
+            metrics[key][rows] = values
+
+    result = pd.DataFrame(metrics, index=pd.Index(skus, name="sku"))
+    result["on_hand"] = on_hand
+    result["on_hand_source"] = np.where(np.isfinite(on_hand), "inventory", "missing")
+    result["expected_units"] = mean.sum(axis=1)
+    result["price"] = [SKU_PRICE.get(sku) for sku in skus]
+    result["revenue_at_risk"] = result["expected_lost_units"] * result["price"]
+    return result
+
+
+def stockout_risk(horizon: int, paths: int = DEFAULT_PATHS, region: str = GLOBAL_REGION) -> pd.DataFrame:
+    """Simulated stockout metrics per SKU, cached per data version, region, horizon and path count."""
+    version = f"{historic_version()}|{inventory_version()}"
+    return cached_variant(
+        f"stockout|{region}|{horizon}|{paths}", version, lambda: _run_simulation(horizon, paths, region)
+    )
+
+
+def sku_stockout_risk(sku: str, horizon: int, region: str = GLOBAL_REGION) -> Optional[pd.Series]:
+    risk = stockout_risk(horizon, region=region)
+    if sku not in risk.index:
+        return None
+    return risk.loc[sku]
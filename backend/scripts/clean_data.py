@@ -1,15 +1,26 @@
 #!/usr/bin/env python3
-"""Clean historic.csv and social.csv into normalized parquet/json files.
+"""Clean historic.csv and the signal feeds into normalized parquet/json files.
 
 Usage:
     python clean_data.py --data-dir ../data --out-dir ../data/cleaned
 
-Produces: historic.parquet, historic.json, social.parquet, social.json
+Produces: historic.parquet, historic.json, historic_regions/ (partitioned by
+region), social.parquet, social.json,
+social_top_hashtags.json, google_signals.parquet, google_signals.json,
+signal_rankings.json
 """
 from pathlib import Path
 import argparse
+import json
 import pandas as pd
 import os
+import shutil
+import sys
+
+# region names, signal normalization and rankings are shared with the API
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.data import DEFAULT_REGION, GLOBAL_REGION, SIGNAL_FEEDS, normalize_signal_feed, read_signals  # noqa: E402
+from app.rankings import HashtagRankings  # noqa: E402
 
 
 def ensure_dir(p: Path):
@@ -22,7 +33,7 @@ def clean_historic(data_dir: Path, out_dir: Path):
         print(f"historic.csv not found at {src}")
         return None
 
-    df = pd.read_csv(src, parse_dates=["date"], infer_datetime_format=True)
+    df = pd.read_csv(src, parse_dates=["date"])
 
     # map common column names to expected
     col_map = {}
@@ -34,6 +45,8 @@ def clean_historic(data_dir: Path, out_dir: Path):
             col_map[c] = "sku"
         if lc in ("units", "sales", "quantity", "qty"):
             col_map[c] = "units"
+        if lc in ("region", "market", "store_region"):
+            col_map[c] = "region"
 
     df = df.rename(columns=col_map)
 
@@ -43,28 +56,34 @@ def clean_historic(data_dir: Path, out_dir: Path):
     # keep only required columns
     df["sku"] = df.get("sku", "UNK").fillna("UNK").astype(str)
     df["units"] = pd.to_numeric(df.get("units", 0), errors="coerce").fillna(0).astype(int)
+    # "global" is the API's cross-region total, so it cannot be a stored region
+    region = df.get("region", pd.Series("", index=df.index)).fillna("").astype(str).str.strip()
+    df["region"] = region.replace({"": DEFAULT_REGION, GLOBAL_REGION: DEFAULT_REGION})
 
-    df = df[["date", "sku", "units"]].sort_values(["sku", "date"]) 
-    df = df.drop_duplicates(subset=["sku", "date"], keep="last")
+    df = df[["date", "sku", "region", "units"]].sort_values(["region", "sku", "date"])
+    df = df.drop_duplicates(subset=["region", "sku", "date"], keep="last")
 
     ensure_dir(out_dir)
     out_par = out_dir / "historic.parquet"
     out_json = out_dir / "historic.json"
+    out_parts = out_dir / "historic_regions"
     df.to_parquet(out_par, index=False)
     df.to_json(out_json, orient="records", date_format="iso")
-    print(f"Wrote cleaned historic to {out_par} and {out_json}")
+    # one parquet partition per region; clear old partitions so removed regions don't linger
+    if out_parts.exists():
+        shutil.rmtree(out_parts)
+    df.to_parquet(out_parts, index=False, partition_cols=["region"])
+    print(f"Wrote cleaned historic to {out_par}, {out_json}, and {out_parts}/")
     return out_par
 
 
-def _normalize_hashtag(tag: str):
-    if not isinstance(tag, str):
-        return ""
-    tag = tag.strip()
-    if tag == "":
-        return ""
-    if not tag.startswith("#"):
-        tag = "#" + tag
-    return tag.lower()
+def _clean_signal_feed(src: Path, feed: str) -> pd.DataFrame:
+    """Normalize a signal CSV into the shared date/sku/source/hashtag/mentions layout."""
+    try:
+        df = normalize_signal_feed(pd.read_csv(src), SIGNAL_FEEDS[feed]["default_source"])
+    except ValueError as exc:
+        raise ValueError(f"{src.name}: {exc}") from exc
+    return df.sort_values(["date"]).drop_duplicates()
 
 
 def clean_social(data_dir: Path, out_dir: Path):
@@ -73,36 +92,7 @@ def clean_social(data_dir: Path, out_dir: Path):
         print(f"social.csv not found at {src}")
         return None
 
-    df = pd.read_csv(src, parse_dates=["date"], infer_datetime_format=True)
-
-    # normalize column names
-    col_map = {}
-    for c in df.columns:
-        lc = c.lower()
-        if lc in ("date", "ts", "timestamp"):
-            col_map[c] = "date"
-        if lc in ("hashtag", "tag", "topic"):
-            col_map[c] = "hashtag"
-        if lc in ("mentions", "count", "mentions_count"):
-            col_map[c] = "mentions"
-        if lc in ("source", "platform"):
-            col_map[c] = "source"
-        if lc in ("sku", "product"):
-            col_map[c] = "sku"
-
-    df = df.rename(columns=col_map)
-
-    # ensure columns exist
-    if "date" not in df.columns:
-        raise ValueError("social.csv must have a date/timestamp column")
-
-    df["hashtag"] = df.get("hashtag", "").fillna("").apply(_normalize_hashtag)
-    df["mentions"] = pd.to_numeric(df.get("mentions", 0), errors="coerce").fillna(0).astype(int)
-    df["source"] = df.get("source", "unknown").fillna("unknown").astype(str)
-    df["sku"] = df.get("sku", "").fillna("").astype(str)
-
-    df = df[["date", "sku", "source", "hashtag", "mentions"]].sort_values(["date"]) 
-    df = df.drop_duplicates()
+    df = _clean_signal_feed(src, "social")
 
     # top hashtags
     top = df["hashtag"].value_counts().reset_index()
@@ -120,8 +110,41 @@ def clean_social(data_dir: Path, out_dir: Path):
     return out_par
 
 
+def clean_google_signals(data_dir: Path, out_dir: Path):
+    src = data_dir / "google_signals.csv"
+    if not src.exists():
+        print(f"google_signals.csv not found at {src}")
+        return None
+
+    df = _clean_signal_feed(src, "google")
+
+    ensure_dir(out_dir)
+    out_par = out_dir / "google_signals.parquet"
+    out_json = out_dir / "google_signals.json"
+    df.to_parquet(out_par, index=False)
+    df.to_json(out_json, orient="records", date_format="iso")
+    print(f"Wrote cleaned google signals to {out_par} and {out_json}")
+    return out_par
+
+
+def write_rankings(data_dir: Path, out_dir: Path):
+    """Precompute top-hashtag rankings per scope for the API's top-k lookups."""
+    signals = read_signals(out_dir, data_dir)
+    if signals.empty:
+        print("no signal files found; skipping rankings")
+        return None
+
+    rankings = HashtagRankings.from_frame(signals)
+    payload = rankings.to_file()
+    out_path = out_dir / "signal_rankings.json"
+    with out_path.open("w", encoding="utf-8") as fh:
+        json.dump(payload, fh)
+    print(f"Wrote signal rankings ({len(payload['scopes'])} scopes) to {out_path}")
+    return out_path
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Clean historic and social CSVs")
+    parser = argparse.ArgumentParser(description="Clean historic and signal CSVs")
     parser.add_argument("--data-dir", type=str, default=str(Path(__file__).resolve().parents[1] / "data"))
     parser.add_argument("--out-dir", type=str, default=str(Path(__file__).resolve().parents[1] / "data" / "cleaned"))
     args = parser.parse_args()
@@ -132,6 +155,8 @@ def main():
     print(f"Reading from {data_dir}, writing cleaned files to {out_dir}")
     clean_historic(data_dir, out_dir)
     clean_social(data_dir, out_dir)
+    clean_google_signals(data_dir, out_dir)
+    write_rankings(data_dir, out_dir)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Asyncio load test for the Techfy Demand API.
+
+Simulates dashboard sessions against `app.main:app`, either in-process through
+httpx's ASGI transport (default) or against a running server with --url.
+Every virtual user opens a page, fires that page's queries concurrently like
+react-query does on mount, and keeps polling on the page's refetch interval.
+
+Run from the `backend` folder:
+  python scripts/load_test.py --users 50 --duration 60
+  python scripts/load_test.py --url http://localhost:8000 --rss-pid <uvicorn pid>
+  python scripts/load_test.py --users 200 --time-scale 10 --mix overview=1,live_trends=3
+
+--time-scale divides the poll interval and think time so long polling
+patterns fit in a short run. Reports throughput, p50/p95/p99 latency, error
+rate and worker RSS over time. Needs `httpx` (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Page -> (requests fired together on load, requests re-fetched every poll).
+# Mirrors src/pages/Overview.tsx and src/pages/LiveTrends.tsx; LiveTrends
+# polls its signals query on a 30s refetchInterval.
+PAGES = {
+    "overview": (
+        [
+            "/api/sku-mapping",
+            "/api/trends",
+            "/api/social",
+            "/api/forecast?sku=GS-019&horizon=14",
+        ],
+        [],
+    ),
+    "live_trends": (
+        [
+            "/api/signals",
+            "/api/social",
+            "/api/signals/google",
+            "/api/trends",
+        ],
+        ["/api/signals"],
+    ),
+    "forecast": (
+        [
+            "/api/historic?sku=GS-019&points=365",
+            "/api/forecast?sku=GS-019&horizon=30",
+        ],
+        [],
+    ),
+}
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in PAGES:
+            raise argparse.ArgumentTypeError(f"unknown page {name!r}; choose from {', '.join(PAGES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _rss_mb(pid):
+    try:
+        import psutil
+
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # nearest-rank: the smallest value with at least pct% of samples at or below it
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[rank]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rss = []
+        self.started = time.perf_counter()
+
+    def record(self, path, seconds, ok):
+        key = path.split("?")[0]
+        self.latencies[key].append(seconds * 1000)
+        if not ok:
+            self.errors[key] += 1
+
+    def summary(self, elapsed):
+        def block(values, errors):
+            ordered = sorted(values)
+            return {
+                "requests": len(ordered),
+                "errors": errors,
+                "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+                "p50_ms": _round(_percentile(ordered, 50)),
+                "p95_ms": _round(_percentile(ordered, 95)),
+                "p99_ms": _round(_percentile(ordered, 99)),
+                "max_ms": _round(ordered[-1] if ordered else None),
+            }
+
+        everything = [value for values in self.latencies.values() for value in values]
+        overall = block(everything, sum(self.errors.values()))
+        overall["throughput_rps"] = round(len(everything) / elapsed, 2) if elapsed else 0.0
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "overall": overall,
+            "endpoints": {
+                path: block(values, self.errors.get(path, 0)) for path, values in sorted(self.latencies.items())
+            },
+            "rss_mb": self.rss,
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+async def _request(client, stats, path, timeout):
+    start = time.perf_counter()
+    ok = False
+    try:
+        response = await client.get(path, timeout=timeout)
+        ok = response.status_code < 400
+    except Exception:
+        ok = False
+    stats.record(path, time.perf_counter() - start, ok)
+
+
+async def _user(client, stats, args, deadline, rng):
+    pages = list(args.mix)
+    weights = [args.mix[name] for name in pages]
+    poll_every = args.poll_interval / args.time_scale
+    think = args.think_time / args.time_scale
+    # stagger session starts so users don't arrive in lockstep
+    await asyncio.sleep(rng.uniform(0, min(poll_every, 1.0)))
+    while time.perf_counter() < deadline:
+        page = rng.choices(pages, weights=weights)[0]
+        on_load, polled = PAGES[page]
+        await asyncio.gather(*(_request(client, stats, path, args.timeout) for path in on_load))
+        session_end = time.perf_counter() + rng.uniform(0.5, 1.5) * args.session_length / args.time_scale
+        while polled and time.perf_counter() + poll_every < min(deadline, session_end):
+            await asyncio.sleep(poll_every)
+            await asyncio.gather(*(_request(client, stats, path, args.timeout) for path in polled))
+        await asyncio.sleep(rng.uniform(0, think) if think else 0)
+
+
+async def _sample_rss(stats, pid, interval, deadline):
+    while time.perf_counter() < deadline:
+        rss = _rss_mb(pid)
+        if rss is not None:
+            stats.rss.append({"t_s": round(time.perf_counter() - stats.started, 1), "rss_mb": round(rss, 1)})
+        await asyncio.sleep(interval)
+
+
+async def _progress(stats, interval, deadline):
+    last_total = 0
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(interval)
+        total = sum(len(values) for values in stats.latencies.values())
+        errors = sum(stats.errors.values())
+        rss = stats.rss[-1]["rss_mb"] if stats.rss else "n/a"
+        elapsed = time.perf_counter() - stats.started
+        print(f"[{elapsed:6.1f}s] {total} requests (+{(total - last_total) / interval:.1f}/s), {errors} errors, rss {rss} MB")
+        last_total = total
+
+
+def _make_client(args):
+    limits = httpx.Limits(max_connections=args.users * 4, max_keepalive_connections=args.users * 4)
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url.rstrip("/"), limits=limits)
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits)
+
+
+async def run(args):
+    stats = Stats()
+    rng = random.Random(args.seed)
+    rss_pid = args.rss_pid or (None if args.url else os.getpid())
+    async with _make_client(args) as client:
+        if args.warmup:
+            for page in args.mix:
+                for path in PAGES[page][0]:
+                    await client.get(path, timeout=args.timeout)
+        stats.started = time.perf_counter()
+        deadline = stats.started + args.duration
+        tasks = [asyncio.create_task(_user(client, stats, args, deadline, random.Random(rng.random()))) for _ in range(args.users)]
+        helpers = [asyncio.create_task(_progress(stats, args.report_every, deadline))]
+        if rss_pid:
+            helpers.append(asyncio.create_task(_sample_rss(stats, rss_pid, args.rss_every, deadline)))
+        await asyncio.gather(*tasks)
+        for helper in helpers:
+            helper.cancel()
+    return stats.summary(time.perf_counter() - stats.started)
+
+
+def _print_summary(summary):
+    overall = summary["overall"]
+    print()
+    print(f"=== {overall['requests']} requests in {summary['elapsed_s']}s ({overall['throughput_rps']} req/s) ===")
+    print(f"{'endpoint':28} {'reqs':>7} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = list(summary["endpoints"].items()) + [("TOTAL", overall)]
+    for path, block in rows:
+        print(
+            f"{path:28} {block['requests']:>7} {block['error_rate'] * 100:>5.1f}% "
+            f"{block['p50_ms'] or 0:>8.1f}ms {block['p95_ms'] or 0:>8.1f}ms "
+            f"{block['p99_ms'] or 0:>8.1f}ms {block['max_ms'] or 0:>8.1f}ms"
+        )
+    if summary["rss_mb"]:
+        values = [sample["rss_mb"] for sample in summary["rss_mb"]]
+        print(f"RSS: start {values[0]} MB, peak {max(values)} MB, end {values[-1]} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Techfy Demand API")
+    parser.add_argument("--url", help="Base URL of a running server; omit to drive app.main:app in-process")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent dashboard sessions")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test length in seconds")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("overview=1,live_trends=1"),
+                        help=f"Weighted page mix, e.g. overview=1,live_trends=3 (pages: {', '.join(PAGES)})")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Dashboard refetchInterval in seconds")
+    parser.add_argument("--session-length", type=float, default=120.0, help="Average seconds a user stays on a page")
+    parser.add_argument("--think-time", type=float, default=5.0, help="Max pause between page views in seconds")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Divide poll/session/think times by this factor")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--rss-pid", type=int, help="PID whose RSS to sample (defaults to this process in-process)")
+    parser.add_argument("--rss-every", type=float, default=1.0, help="RSS sampling interval in seconds")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Progress line interval in seconds")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="Skip priming caches before the run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the full summary to this file")
+    args = parser.parse_args()
+
+    if httpx is None:
+        print("httpx is required: pip install httpx")
+        sys.exit(1)
+    if args.time_scale <= 0:
+        parser.error("--time-scale must be positive")
+
+    mode = args.url or "in-process app.main:app"
+    print(f"Load testing {mode} with {args.users} users for {args.duration}s, mix {args.mix}")
+    summary = asyncio.run(run(args))
+    _print_summary(summary)
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(summary, fh, indent=2)
+        print(f"Wrote summary to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
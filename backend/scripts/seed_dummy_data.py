@@ -1,6 +1,10 @@
 import pandas as pd, numpy as np
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.data import DEFAULT_REGION  # noqa: E402
+
 DATA = Path(__file__).resolve().parents[1] / "data"
 DATA.mkdir(exist_ok=True)
 
@@ -8,8 +12,9 @@ dates = pd.date_range(end=pd.Timestamp.today(), periods=30)
 
 # historic.csv
 rows = []
+bases = {}
 for sku in ["GS-019","BL-101"]:
-    base = np.random.randint(50,200)
+    base = bases[sku] = np.random.randint(50,200)
     for d in dates:
         rows.append({"date": d.strftime("%Y-%m-%d"), "sku": sku, "units": int(base + np.random.randint(-20,20))})
 pd.DataFrame(rows).to_csv(DATA/"historic.csv", index=False)
@@ -22,4 +27,12 @@ for d in dates:
         rows.append({"date": d.strftime("%Y-%m-%d"), "hashtag": h, "mentions": int(np.random.randint(0,50)), "source":"TikTok", "sku":"GS-019"})
 pd.DataFrame(rows).to_csv(DATA/"social.csv", index=False)
 
+# inventory.csv: 5-25 days of cover per SKU; historic rows have no region,
+# so stock goes to the same default region
+rows = [
+    {"region": DEFAULT_REGION, "sku": sku, "on_hand": int(base * np.random.randint(5,25))}
+    for sku, base in bases.items()
+]
+pd.DataFrame(rows).to_csv(DATA/"inventory.csv", index=False)
+
 print("Dummy data written to", DATA)